@@ -1,8 +1,12 @@
 /** @type {import('next').NextConfig} */
 const nextConfig = {
   experimental: {
-    appDir: true,
+    // Load the Claude Code SDK from node_modules at runtime instead of bundling it,
+    // so its CLI subprocess resolves and the server bundle stays small
+    serverComponentsExternalPackages: ['@anthropic-ai/claude-code'],
   },
+  // Skip the X-Powered-By header on every response
+  poweredByHeader: false,
 }
 
-module.exports = nextConfig
\ No newline at end of file
+module.exports = nextConfig
@@ -0,0 +1,40 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { generateGame, parsePrompt } from '../../../../lib/gameRequest'
+import { startJob } from '../../../../lib/jobs'
+import { logger } from '../../../../lib/logger'
+
+// Start a build in the background and return a job id to poll at /api/generate/result/{jobId}
+export async function POST(request: NextRequest) {
+  try {
+    const body = await request.json()
+    const prompt = parsePrompt(body.prompt)
+
+    if (!prompt) {
+      return NextResponse.json(
+        { error: 'Prompt is required and must be a string' },
+        { status: 400 }
+      )
+    }
+
+    const useCache = body.useCache !== false
+    const jobId = startJob(() => generateGame(prompt, useCache))
+
+    if (!jobId) {
+      return NextResponse.json(
+        { error: 'Too many builds are already queued, try again later' },
+        { status: 429 }
+      )
+    }
+
+    return NextResponse.json({ jobId }, { status: 202 })
+  } catch (error) {
+    logger.error('API Error:', error)
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error instanceof Error ? error.message : 'Unknown error'
+      },
+      { status: 500 }
+    )
+  }
+}
@@ -0,0 +1,55 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { DEFAULT_BATCH_CONCURRENCY, generateGames, parsePrompt } from '../../../../lib/gameRequest'
+import { logger } from '../../../../lib/logger'
+
+// Upper bounds so one request can't monopolize the Claude Code sessions
+const MAX_BATCH_SIZE = 20
+const MAX_CONCURRENCY = 8
+
+// Build several games in one request, running up to maxConcurrency builds at a time
+export async function POST(request: NextRequest) {
+  try {
+    const body = await request.json()
+
+    if (!Array.isArray(body.prompts) || body.prompts.length === 0) {
+      return NextResponse.json(
+        { error: 'Prompts are required and must be a non-empty array of strings' },
+        { status: 400 }
+      )
+    }
+
+    if (body.prompts.length > MAX_BATCH_SIZE) {
+      return NextResponse.json(
+        { error: `A batch may contain at most ${MAX_BATCH_SIZE} prompts` },
+        { status: 400 }
+      )
+    }
+
+    const prompts = body.prompts.map(parsePrompt)
+    if (prompts.some((prompt: string | null) => !prompt)) {
+      return NextResponse.json(
+        { error: 'Prompts are required and must be a non-empty array of strings' },
+        { status: 400 }
+      )
+    }
+
+    const concurrency = Math.min(
+      Math.max(Number(body.maxConcurrency) || DEFAULT_BATCH_CONCURRENCY, 1),
+      MAX_CONCURRENCY
+    )
+
+    // Results keep the order of the submitted prompts
+    const results = await generateGames(prompts, concurrency, body.useCache !== false, request.signal)
+
+    return NextResponse.json({ results })
+  } catch (error) {
+    logger.error('API Error:', error)
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error instanceof Error ? error.message : 'Unknown error'
+      },
+      { status: 500 }
+    )
+  }
+}
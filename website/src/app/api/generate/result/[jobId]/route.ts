@@ -0,0 +1,26 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { serializeResult } from '../../../../../lib/gameRequest'
+import { getJob } from '../../../../../lib/jobs'
+
+// Poll a background build: 202 while it runs, 200 with the BuildResult once done
+export async function GET(
+  request: NextRequest,
+  { params }: { params: { jobId: string } }
+) {
+  const job = getJob(params.jobId)
+
+  if (!job) {
+    return NextResponse.json(
+      { error: 'Job not found' },
+      { status: 404 }
+    )
+  }
+
+  if (job.status === 'pending') {
+    return NextResponse.json({ status: 'pending' }, { status: 202 })
+  }
+
+  return new NextResponse(serializeResult(job.result), {
+    headers: { 'Content-Type': 'application/json' }
+  })
+}
@@ -0,0 +1,94 @@
+import { NextRequest, NextResponse } from 'next/server'
+import type { BuildEvent } from '../../../../lib/buildWithClaude'
+import { parsePrompt, serializeResult, streamGame } from '../../../../lib/gameRequest'
+import { logger } from '../../../../lib/logger'
+
+// Stream build events to the client as Server-Sent Events, one `data:` frame per event
+export async function POST(request: NextRequest) {
+  try {
+    const body = await request.json()
+    const prompt = parsePrompt(body.prompt)
+
+    if (!prompt) {
+      return NextResponse.json(
+        { error: 'Prompt is required and must be a string' },
+        { status: 400 }
+      )
+    }
+
+    // Clients can pass useCache: false to force a fresh build
+    const useCache = body.useCache !== false
+
+    const encoder = new TextEncoder()
+    const stream = new ReadableStream({
+      async start(controller) {
+        const send = (event: BuildEvent) => {
+          // Results are serialized through serializeResult so cache hits reuse their JSON
+          const data = event.type === 'done'
+            ? `{"type":"done","result":${serializeResult(event.result)}}`
+            : JSON.stringify(event)
+          controller.enqueue(encoder.encode(`data: ${data}\n\n`))
+        }
+
+        // Set once the final frame is out, so an error after it doesn't send a second one
+        let finished = false
+        // Set once a message has been streamed, which only happens for live builds
+        let streamed = false
+
+        try {
+          // Aborting the request (client disconnect) stops the Claude Code session
+          for await (const event of streamGame(prompt, useCache, request.signal)) {
+            if (event.type !== 'done') {
+              streamed = true
+              send(event)
+              continue
+            }
+            // A live build's messages were already streamed one by one, so its final
+            // frame leaves them out; a cached result arrives as this single frame
+            send(streamed ? { type: 'done', result: { ...event.result, messages: [] } } : event)
+            finished = true
+          }
+        } catch (error) {
+          logger.error('Stream Error:', error)
+          if (!finished) {
+            try {
+              send({ type: 'done', result: {
+                success: false,
+                error: error instanceof Error ? error.message : 'Unknown error',
+                messages: [],
+                filesCreated: [],
+                codeGenerated: {},
+                summary: ''
+              } })
+            } catch {
+              // The client already disconnected and the stream was cancelled
+            }
+          }
+        } finally {
+          try {
+            controller.close()
+          } catch {
+            // The client already disconnected and the stream was cancelled
+          }
+        }
+      }
+    })
+
+    return new Response(stream, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache, no-transform',
+        'Connection': 'keep-alive'
+      }
+    })
+  } catch (error) {
+    logger.error('API Error:', error)
+    return NextResponse.json(
+      {
+        error: 'Internal server error',
+        details: error instanceof Error ? error.message : 'Unknown error'
+      },
+      { status: 500 }
+    )
+  }
+}
@@ -2,6 +2,9 @@
 
 import { useState, useRef, useEffect } from 'react'
 
+// Keep only the most recent prompts so history stays small for long sessions
+const MAX_HISTORY = 50
+
 interface CodeInputProps {
   onGenerate: (prompt: string) => Promise<void>
   isLoading: boolean
@@ -18,37 +21,35 @@ export function CodeInput({ onGenerate, isLoading }: CodeInputProps) {
     inputRef.current?.focus()
   }, [])
 
-  useEffect(() => {
-    const updateCursorPosition = () => {
-      if (inputRef.current) {
-        const { selectionStart } = inputRef.current
-        const textBeforeCursor = inputRef.current.value.substring(0, selectionStart)
-        const lines = textBeforeCursor.split('\n')
-        const currentLine = lines.length - 1
-        const currentLineText = lines[currentLine] || ''
-        
-        // Create a temporary span to measure the actual width
-        const tempSpan = document.createElement('span')
-        tempSpan.style.visibility = 'hidden'
-        tempSpan.style.position = 'absolute'
-        tempSpan.style.fontSize = getComputedStyle(inputRef.current).fontSize
-        tempSpan.style.fontFamily = getComputedStyle(inputRef.current).fontFamily
-        tempSpan.style.fontWeight = getComputedStyle(inputRef.current).fontWeight
-        tempSpan.style.letterSpacing = getComputedStyle(inputRef.current).letterSpacing
-        tempSpan.style.whiteSpace = 'pre'  // Preserve spaces
-        tempSpan.textContent = currentLineText
-        
-        document.body.appendChild(tempSpan)
-        const textWidth = tempSpan.offsetWidth
-        document.body.removeChild(tempSpan)
-        
-        setCursorPosition({ 
-          line: currentLine, 
-          column: textWidth 
-        })
-      }
+  const updateCursorPosition = () => {
+    if (inputRef.current) {
+      const { selectionStart } = inputRef.current
+      const textBeforeCursor = inputRef.current.value.substring(0, selectionStart)
+      const lines = textBeforeCursor.split('\n')
+      const currentLine = lines.length - 1
+      const currentLineText = lines[currentLine] || ''
+      
+      // Create a temporary span to measure the actual width
+      const style = getComputedStyle(inputRef.current)
+      const tempSpan = document.createElement('span')
+      tempSpan.style.visibility = 'hidden'
+      tempSpan.style.position = 'absolute'
+      tempSpan.style.fontSize = style.fontSize
+      tempSpan.style.fontFamily = style.fontFamily
+      tempSpan.style.fontWeight = style.fontWeight
+      tempSpan.style.letterSpacing = style.letterSpacing
+      tempSpan.style.whiteSpace = 'pre'  // Preserve spaces
+      tempSpan.textContent = currentLineText
+      
+      document.body.appendChild(tempSpan)
+      const textWidth = tempSpan.offsetWidth
+      document.body.removeChild(tempSpan)
+      
+      setCursorPosition({ line: currentLine, column: textWidth })
     }
-    
+  }
+
+  useEffect(() => {
     // Update cursor position immediately
     updateCursorPosition()
     
@@ -69,9 +70,12 @@ export function CodeInput({ onGenerate, isLoading }: CodeInputProps) {
     e.preventDefault()
     if (!prompt.trim() || isLoading) return
     
-    setHistory([...history, prompt.trim()])
+    const trimmed = prompt.trim()
+    if (history[history.length - 1] !== trimmed) {
+      setHistory([...history, trimmed].slice(-MAX_HISTORY))
+    }
     setHistoryIndex(-1)
-    await onGenerate(prompt.trim())
+    await onGenerate(trimmed)
     setPrompt('')
   }
 
@@ -99,33 +103,6 @@ export function CodeInput({ onGenerate, isLoading }: CodeInputProps) {
     }
   }
 
-  const updateCursorPosition = () => {
-    if (inputRef.current) {
-      const { selectionStart } = inputRef.current
-      const textBeforeCursor = inputRef.current.value.substring(0, selectionStart)
-      const lines = textBeforeCursor.split('\n')
-      const currentLine = lines.length - 1
-      const currentLineText = lines[currentLine] || ''
-      
-      // Measure actual text width
-      const tempSpan = document.createElement('span')
-      tempSpan.style.visibility = 'hidden'
-      tempSpan.style.position = 'absolute'
-      tempSpan.style.fontSize = getComputedStyle(inputRef.current).fontSize
-      tempSpan.style.fontFamily = getComputedStyle(inputRef.current).fontFamily
-      tempSpan.style.fontWeight = getComputedStyle(inputRef.current).fontWeight
-      tempSpan.style.letterSpacing = getComputedStyle(inputRef.current).letterSpacing
-      tempSpan.style.whiteSpace = 'pre'
-      tempSpan.textContent = currentLineText
-      
-      document.body.appendChild(tempSpan)
-      const textWidth = tempSpan.offsetWidth
-      document.body.removeChild(tempSpan)
-      
-      setCursorPosition({ line: currentLine, column: textWidth })
-    }
-  }
-
   return (
     <div className="w-full">
       <form onSubmit={handleSubmit} className="relative">
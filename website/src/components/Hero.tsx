@@ -4,15 +4,7 @@ import { useState, useEffect } from 'react'
 import { CodeInput } from './CodeInput'
 import { MessageDisplay } from './MessageDisplay'
 import { SDKMessage } from '@anthropic-ai/claude-code'
-
-interface BuildResult {
-  success: boolean
-  messages: SDKMessage[]
-  filesCreated: string[]
-  codeGenerated: Record<string, string>
-  summary: string
-  error?: string
-}
+import type { BuildEvent, BuildResult } from '../lib/buildWithClaude'
 
 export function Hero() {
   const [isGenerating, setIsGenerating] = useState(false)
@@ -37,7 +29,7 @@ export function Hero() {
     setBuildResult(null)
     
     try {
-      const response = await fetch('/api/generate', {
+      const response = await fetch('/api/generate/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -45,15 +37,46 @@ export function Hero() {
         body: JSON.stringify({ prompt }),
       })
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         const errorData = await response.json()
         throw new Error(errorData.error || 'Failed to generate code')
       }
 
-      const result: BuildResult = await response.json()
-      
+      // Read Server-Sent Events frames as they arrive and show each message immediately
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let result: BuildResult | null = null
+
+      for (;;) {
+        const { done, value } = await reader.read()
+        if (done) break
+
+        buffer += decoder.decode(value, { stream: true })
+        const frames = buffer.split('\n\n')
+        buffer = frames.pop() ?? ''
+
+        for (const frame of frames) {
+          if (!frame.startsWith('data: ')) continue
+          const event: BuildEvent = JSON.parse(frame.slice(6))
+          if (event.type === 'message') {
+            setMessages(prev => [...prev, event.message])
+          } else {
+            result = event.result
+          }
+        }
+      }
+
+      if (!result) {
+        throw new Error('Generation ended without a result')
+      }
+
       if (result.success) {
-        setMessages(result.messages)
+        // Live builds stream their messages before the result; cached
+        // results arrive as a single frame that carries the transcript
+        if (result.messages.length > 0) {
+          setMessages(result.messages)
+        }
         setBuildResult(result)
       } else {
         setError(result.error || 'Generation failed')
@@ -1,6 +1,7 @@
 'use client'
 
 import { SDKMessage } from "@anthropic-ai/claude-code"
+import type { BuildUsage } from "../lib/buildWithClaude"
 
 interface MessageDisplayProps {
   messages: SDKMessage[]
@@ -11,9 +12,15 @@ interface MessageDisplayProps {
     filesCreated: string[]
     codeGenerated: Record<string, string>
     summary: string
+    usage?: BuildUsage
   } | null
 }
 
+// Render message content once: strings as-is, structured content as indented JSON
+function formatContent(content: unknown): string {
+  return typeof content === 'string' ? content : JSON.stringify(content, null, 2)
+}
+
 export function MessageDisplay({ messages, isGenerating, error, buildResult }: MessageDisplayProps) {
   if (messages.length === 0 && !isGenerating && !error) {
     return null
@@ -38,9 +45,7 @@ export function MessageDisplay({ messages, isGenerating, error, buildResult }: M
                 <div>
                   <div className="text-amber-400 text-xs mb-2">[ASSISTANT MESSAGE {index + 1}]</div>
                   <div className="terminal-text text-sm whitespace-pre-wrap">
-                    {typeof message.message.content === 'string' 
-                      ? message.message.content 
-                      : JSON.stringify(message.message.content, null, 2)}
+                    {formatContent(message.message.content)}
                   </div>
                 </div>
               )}
@@ -50,7 +55,7 @@ export function MessageDisplay({ messages, isGenerating, error, buildResult }: M
                   <div className="text-cyan-400 text-xs mb-2">[RESULT]</div>
                   <div className="terminal-text text-sm">
                     {'result' in message && message.result && (
-                      <div>{typeof message.result === 'string' ? message.result : JSON.stringify(message.result, null, 2)}</div>
+                      <div>{formatContent(message.result)}</div>
                     )}
                   </div>
                 </div>
@@ -60,9 +65,7 @@ export function MessageDisplay({ messages, isGenerating, error, buildResult }: M
                 <div>
                   <div className="text-green-400 text-xs mb-2">[USER INPUT]</div>
                   <div className="terminal-text text-sm">
-                    {typeof message.message.content === 'string' 
-                      ? message.message.content 
-                      : JSON.stringify(message.message.content, null, 2)}
+                    {formatContent(message.message.content)}
                   </div>
                 </div>
               )}
@@ -127,6 +130,16 @@ export function MessageDisplay({ messages, isGenerating, error, buildResult }: M
                 </div>
               </div>
             )}
+
+            {/* Usage */}
+            {buildResult.usage && (
+              <div>
+                <div className="text-amber-400 text-xs mb-2">[USAGE]</div>
+                <div className="terminal-text text-xs opacity-70">
+                  TOKENS IN: {buildResult.usage.inputTokens} | OUT: {buildResult.usage.outputTokens} | CACHED: {buildResult.usage.cacheReadInputTokens} | COST: ${buildResult.usage.totalCostUsd.toFixed(4)}
+                </div>
+              </div>
+            )}
         </div>
       )}
     </div>
@@ -1,38 +1,240 @@
-import { query, type SDKMessage } from "@anthropic-ai/claude-code";
+import type { SDKMessage } from "@anthropic-ai/claude-code";
 import dotenv from "dotenv";
+import { promises as fs } from "fs";
+import path from "path";
+import { isLevelEnabled, logger } from "./logger";
+import { RateLimiter } from "./rateLimiter";
+import { Semaphore } from "./semaphore";
 
 // Load environment variables
 dotenv.config();
 
-interface BuildResult {
+// System prompt shared by every build. Kept as a single immutable constant so
+// each request sends a byte-identical prefix that the API's prompt cache can reuse.
+const PHASER_SYSTEM_PROMPT = `You are a Phaser 3 game development specialist. Your role is to create complete, functional HTML5 games using the Phaser 3 framework.
+
+CORE REQUIREMENTS:
+- Always use Phaser 3 framework (latest stable version)
+- Create complete, runnable HTML files with embedded JavaScript
+- Include proper DOCTYPE and meta tags for responsive design
+- Use Phaser CDN link: https://cdn.jsdelivr.net/npm/phaser@3.70.0/dist/phaser.min.js
+
+GAME STRUCTURE:
+- Implement proper Phaser scene structure with preload(), create(), and update() methods
+- Use scene management for complex games (Boot, Preload, Game, GameOver scenes)
+- Include proper game configuration with canvas setup
+- Make games responsive and work on different screen sizes
+- Set up proper game dimensions and scaling
+
+TECHNICAL FEATURES TO INCLUDE:
+- Physics system (Arcade Physics for most games)
+- Player input handling (keyboard, mouse, touch as appropriate)
+- Sprite management and animations
+- Collision detection and response
+- Asset loading and management
+- Basic game states (start, play, pause, game over)
+- Sound effects and music loading (even if not implemented)
+- Score tracking and display
+- Basic UI elements (buttons, text, HUD)
+
+GAME TYPES GUIDANCE:
+- Platformer: Include gravity, jumping, collision with platforms, moving enemies
+- Shooter: Projectile management, enemy spawning, collision detection, health system
+- Puzzle: Grid-based systems, match detection, turn-based or real-time logic
+- Arcade: Simple physics, increasing difficulty, power-ups, high score system
+
+CODE QUALITY:
+- Use modern JavaScript (ES6+) syntax
+- Include comments explaining game logic
+- Organize code into logical sections
+- Handle errors gracefully
+- Use Phaser's built-in methods and properties
+- Follow Phaser best practices for performance
+
+DELIVERABLES:
+- Complete HTML file with embedded CSS and JavaScript
+- Fully functional game that runs in a browser
+- Proper asset loading structure (even if using simple colored rectangles)
+- Basic game loop with win/lose conditions
+- Responsive design that works on desktop and mobile
+- Save the complete game as an HTML file that can be opened directly in a browser
+
+OUTPUT:
+- Write each file once, then reply with a short summary of the game
+- Do not repeat the file contents or add explanations after the summary
+
+Always create a complete, playable game that demonstrates the requested concept using Phaser 3 framework.`;
+
+// Matches phrases like "created file game.html", compiled once and reused for every message
+const FILE_MENTION_PATTERN = /(?:created?|wrote|saved?)\s+(?:file\s+)?(\S+\.(?:html|js|ts|css|json|md))/gi;
+
+// Matches API rate limit errors ("rate_limit_error", "API Error: 429", "429 Too Many
+// Requests") but not a 429 that merely appears in a path or port number
+const RATE_LIMIT_ERROR = /\brate[ _-]?limit|\b(?:status|error|code)\W{0,3}429\b|\b429 too many requests\b/i;
+
+// Resolved SDK module, shared by every build after the first
+let claudeCodeModule: Promise<typeof import("@anthropic-ai/claude-code")> | undefined;
+
+function loadClaudeCode() {
+  if (!claudeCodeModule) {
+    claudeCodeModule = import("@anthropic-ai/claude-code");
+    // Let a later build retry if the import failed. Attaching the handler also
+    // keeps a rejection from going unhandled while a build waits for its slot.
+    claudeCodeModule.catch(() => {
+      claudeCodeModule = undefined;
+    });
+  }
+  return claudeCodeModule;
+}
+
+// Directory the agent writes games into. Each build's files live here only
+// while it runs (see the cleanup in streamWithClaude).
+const WORKING_DIR = path.resolve(process.env.WORKING_DIR || process.cwd());
+
+// Created on first use, then shared by every later build
+let workingDirReady: Promise<unknown> | undefined;
+
+function ensureWorkingDir() {
+  if (!workingDirReady) {
+    workingDirReady = fs.mkdir(WORKING_DIR, { recursive: true });
+    // Let a later build retry if creating the directory failed
+    workingDirReady.catch(() => {
+      workingDirReady = undefined;
+    });
+  }
+  return workingDirReady;
+}
+
+// Each build gets its own subdirectory so concurrent builds never share files,
+// removed again when the build ends. The start time keeps names unique when a
+// restarted server reuses its pid.
+const BUILD_DIR_PREFIX = `build-${process.pid}-${Date.now().toString(36)}`;
+let nextBuildId = 0;
+
+// Dependency and VCS directories the agent may create, which aren't part of the game
+const SKIPPED_BUILD_DIRS = new Set(["node_modules", ".git"]);
+
+/**
+ * Read every file under a build's directory, so the result reflects the files as
+ * they were left, including changes made with Edit, MultiEdit or Bash
+ * @param dir - The directory to read
+ * @param root - The build's directory, which returned paths are relative to
+ * @param files - Map to add each file's relative path and contents to
+ */
+async function readBuildFiles(dir: string, root: string, files: Map<string, string>): Promise<void> {
+  const entries = await fs.readdir(dir, { withFileTypes: true });
+  for (const entry of entries) {
+    const fullPath = path.join(dir, entry.name);
+    if (entry.isDirectory()) {
+      if (!SKIPPED_BUILD_DIRS.has(entry.name)) {
+        await readBuildFiles(fullPath, root, files);
+      }
+    } else if (entry.isFile()) {
+      files.set(path.relative(root, fullPath), await fs.readFile(fullPath, "utf8"));
+    }
+  }
+}
+
+// Query options that are identical for every build, created once at module load
+const STATIC_QUERY_OPTIONS = Object.freeze({
+  // Set max turns to allow multi-step operations
+  maxTurns: Number(process.env.CLAUDE_MAX_TURNS) || 10,
+  
+  // JavaScript runtime (optional)
+  executable: "node" as const,
+  
+  // System prompt to guide Claude's behavior
+  customSystemPrompt: PHASER_SYSTEM_PROMPT,
+  
+  // Permission mode to bypass confirmations
+  permissionMode: "bypassPermissions" as const,
+
+  // Path to Claude Code executable (optional)
+  pathToClaudeCodeExecutable: process.env.CLAUDE_CODE_PATH,
+});
+
+// Model used when the caller doesn't pick one (optional - the SDK has its own default)
+const DEFAULT_MODEL = process.env.CLAUDE_MODEL;
+
+// Shared across all builds in this process so bursts stay under the API's request limit
+const rateLimiter = new RateLimiter(
+  Number(process.env.CLAUDE_REQUESTS_PER_MINUTE) || 50,
+  Number(process.env.CLAUDE_BURST_LIMIT) || 10
+);
+
+// Caps concurrent Claude Code sessions across every route, since each session
+// spawns its own CLI subprocess
+const sessionSlots = new Semaphore(Math.max(1, Number(process.env.CLAUDE_CONCURRENCY) || 4));
+
+// Token counts and cost reported by the SDK for a whole build
+export interface BuildUsage {
+  inputTokens: number;
+  outputTokens: number;
+  cacheReadInputTokens: number;
+  cacheCreationInputTokens: number;
+  totalCostUsd: number;
+}
+
+export interface BuildResult {
   success: boolean;
   messages: SDKMessage[];
   filesCreated: string[];
   codeGenerated: Record<string, string>;
   summary: string;
+  usage?: BuildUsage;
   error?: string;
 }
 
+// Events emitted while a build is running: each SDK message as it arrives,
+// followed by exactly one final "done" event carrying the collected result
+export type BuildEvent =
+  | { type: "message"; message: SDKMessage }
+  | { type: "done"; result: BuildResult };
+
 /**
  * Simple function that takes a prompt and builds code using Claude Code SDK
  * @param prompt - The code generation prompt (e.g., "Build a React todo app")
  * @param abortSignal - Optional AbortSignal to cancel the request
+ * @param model - Optional model override (defaults to CLAUDE_MODEL)
  * @returns Promise with the generated code and any file operations performed
  */
 export async function buildWithClaude(
   prompt: string,
-  abortSignal?: AbortSignal
+  abortSignal?: AbortSignal,
+  model?: string
 ): Promise<BuildResult> {
+  let result: BuildResult | undefined;
+  for await (const event of streamWithClaude(prompt, abortSignal, model)) {
+    if (event.type === "done") {
+      result = event.result;
+    }
+  }
+  return result!;
+}
+
+/**
+ * Streaming variant of buildWithClaude that yields SDK messages as they arrive
+ * @param prompt - The code generation prompt (e.g., "Build a React todo app")
+ * @param abortSignal - Optional AbortSignal to cancel the request
+ * @param model - Optional model override (defaults to CLAUDE_MODEL)
+ * @returns Async iterator of message events, ending with a "done" event
+ */
+export async function* streamWithClaude(
+  prompt: string,
+  abortSignal?: AbortSignal,
+  model?: string
+): AsyncGenerator<BuildEvent> {
   // Ensure API key is set
   if (!process.env.ANTHROPIC_API_KEY) {
-    return {
+    yield { type: "done", result: {
       success: false,
       error: "ANTHROPIC_API_KEY not found in environment variables. Please set it in your .env file.",
       messages: [],
       filesCreated: [],
       codeGenerated: {},
       summary: ""
-    };
+    } };
+    return;
   }
 
   // Create abort controller if not provided
@@ -42,86 +244,116 @@ export async function buildWithClaude(
   
   if (abortSignal) {
     abortSignal.addEventListener('abort', () => abortController.abort());
+    // The listener never fires for a signal that was already aborted
+    if (abortSignal.aborted) {
+      abortController.abort();
+    }
   }
 
+  // Builds can wait a long time for a session slot; stop before spending a
+  // rate limit token or starting a session for a client that has gone
+  const throwIfAborted = () => {
+    if (abortController.signal.aborted) {
+      const error = new Error("Request was aborted");
+      error.name = "AbortError";
+      throw error;
+    }
+  };
+
   // Collect all messages from the query
   const messages: SDKMessage[] = [];
   const filesCreated: string[] = [];
+  // Set mirror of filesCreated so dedupe checks don't rescan the list
+  const seenFiles: Set<string> = new Set();
+  const recordFile = (filename: string) => {
+    if (!seenFiles.has(filename)) {
+      seenFiles.add(filename);
+      filesCreated.push(filename);
+    }
+  };
   const codeGenerated: Map<string, string> = new Map();
+  // Summary candidates, updated as messages arrive so the transcript isn't
+  // walked again at the end: the last assistant message wins, otherwise the
+  // earliest result message
+  let assistantSummary: string | undefined;
+  let resultSummary: string | undefined;
+  const summary = () => assistantSummary ?? resultSummary ?? "";
+  let usage: BuildUsage | undefined;
+  let completed = false;
+  let holdsSessionSlot = false;
+  let createdBuildDir = false;
+  // Set once this build has reported a rate limit, so it only backs off once
+  let throttled = false;
+  // Set when the result message reports an error (e.g. an API or credit error),
+  // which Claude Code signals with is_error rather than an exception
+  let resultIsError = false;
+  const buildDir = path.join(WORKING_DIR, `${BUILD_DIR_PREFIX}-${nextBuildId++}`);
+
+  // Replace the captured Write inputs with the files actually left in the build's
+  // directory, which is removed once the build ends
+  const collectBuildFiles = async () => {
+    if (!createdBuildDir) {
+      return;
+    }
+    const onDisk: Map<string, string> = new Map();
+    try {
+      await readBuildFiles(buildDir, buildDir, onDisk);
+    } catch (error) {
+      logger.warn(`Failed to read build directory ${buildDir}:`, error);
+      return;
+    }
+
+    // Drop files the agent wrote and later deleted; writes outside the build's
+    // directory ("../...") can't be checked here and are kept
+    const removed: string[] = [];
+    codeGenerated.forEach((_, filename) => {
+      if (!onDisk.has(filename) && !filename.startsWith("..") && !path.isAbsolute(filename)) {
+        removed.push(filename);
+      }
+    });
+    removed.forEach(filename => codeGenerated.delete(filename));
+
+    onDisk.forEach((content, filename) => {
+      codeGenerated.set(filename, content);
+      recordFile(filename);
+    });
+  };
   
   try {
+    throwIfAborted();
+
+    // Load the SDK on first use so routes that never start a build don't pay for it.
+    // The import starts before the rate limit wait so the two overlap.
+    const claudeCode = loadClaudeCode();
+
+    // Wait for a free session, then for a rate limit slot, so queued builds
+    // don't use up rate limit tokens while they wait
+    await sessionSlots.acquire();
+    holdsSessionSlot = true;
+    throwIfAborted();
+    await rateLimiter.acquire();
+    throwIfAborted();
+
+    const [{ query }] = await Promise.all([claudeCode, ensureWorkingDir()]);
+    throwIfAborted();
+
+    // Without recursive this fails on a name clash instead of silently reusing
+    // another build's directory
+    await fs.mkdir(buildDir);
+    createdBuildDir = true;
+
     // Stream messages from Claude Code using the latest SDK pattern
     for await (const message of query({
       prompt,
       abortController,
       options: {
-        // Set max turns to allow multi-step operations
-        maxTurns: 10,
-        
-        // Working directory
-        cwd: process.cwd(),
-        
-        // JavaScript runtime (optional)
-        executable: "node" as const,
+        ...STATIC_QUERY_OPTIONS,
         
-        // Path to Claude Code executable (optional)
-        pathToClaudeCodeExecutable: process.env.CLAUDE_CODE_PATH,
+        // Working directory, private to this build
+        cwd: buildDir,
         
         // Model to use (optional - defaults to claude-3-5-sonnet-20241022)
-        model: process.env.CLAUDE_MODEL,
-        
-        // System prompt to guide Claude's behavior
-        customSystemPrompt: `You are a Phaser 3 game development specialist. Your role is to create complete, functional HTML5 games using the Phaser 3 framework.
-
-CORE REQUIREMENTS:
-- Always use Phaser 3 framework (latest stable version)
-- Create complete, runnable HTML files with embedded JavaScript
-- Include proper DOCTYPE and meta tags for responsive design
-- Use Phaser CDN link: https://cdn.jsdelivr.net/npm/phaser@3.70.0/dist/phaser.min.js
-
-GAME STRUCTURE:
-- Implement proper Phaser scene structure with preload(), create(), and update() methods
-- Use scene management for complex games (Boot, Preload, Game, GameOver scenes)
-- Include proper game configuration with canvas setup
-- Make games responsive and work on different screen sizes
-- Set up proper game dimensions and scaling
-
-TECHNICAL FEATURES TO INCLUDE:
-- Physics system (Arcade Physics for most games)
-- Player input handling (keyboard, mouse, touch as appropriate)
-- Sprite management and animations
-- Collision detection and response
-- Asset loading and management
-- Basic game states (start, play, pause, game over)
-- Sound effects and music loading (even if not implemented)
-- Score tracking and display
-- Basic UI elements (buttons, text, HUD)
-
-GAME TYPES GUIDANCE:
-- Platformer: Include gravity, jumping, collision with platforms, moving enemies
-- Shooter: Projectile management, enemy spawning, collision detection, health system
-- Puzzle: Grid-based systems, match detection, turn-based or real-time logic
-- Arcade: Simple physics, increasing difficulty, power-ups, high score system
-
-CODE QUALITY:
-- Use modern JavaScript (ES6+) syntax
-- Include comments explaining game logic
-- Organize code into logical sections
-- Handle errors gracefully
-- Use Phaser's built-in methods and properties
-- Follow Phaser best practices for performance
-
-DELIVERABLES:
-- Complete HTML file with embedded CSS and JavaScript
-- Fully functional game that runs in a browser
-- Proper asset loading structure (even if using simple colored rectangles)
-- Basic game loop with win/lose conditions
-- Responsive design that works on desktop and mobile
-
-Always create a complete, playable game that demonstrates the requested concept using Phaser 3 framework.`,
-        
-        // Permission mode to bypass confirmations
-        permissionMode: "bypassPermissions" as const,
+        model: model ?? DEFAULT_MODEL,
       }
     })) {
       messages.push(message);
@@ -129,25 +361,69 @@ Always create a complete, playable game that demonstrates the requested concept
       // Track different message types
       switch (message.type) {
         case "assistant":
+          assistantSummary = undefined;
+
           // Track assistant messages that might contain file operations info
           if ('message' in message && message.message?.content) {
             const content = message.message.content;
             if (typeof content === 'string') {
-              // Simple heuristic to detect file creation
-              const fileMatches = content.match(/(?:created?|wrote|saved?)\s+(?:file\s+)?([^\s]+\.(html|js|ts|css|json|md))/gi);
-              if (fileMatches) {
-                fileMatches.forEach(match => {
-                  const filename = match.split(/\s+/).pop();
-                  if (filename && !filesCreated.includes(filename)) {
-                    filesCreated.push(filename);
-                  }
-                });
+              assistantSummary = content.substring(0, 500); // Limit summary length
+
+              // Simple heuristic to detect file creation; the capture group is the filename
+              FILE_MENTION_PATTERN.lastIndex = 0;
+              let match: RegExpExecArray | null;
+              while ((match = FILE_MENTION_PATTERN.exec(content)) !== null) {
+                recordFile(match[1]);
+              }
+            } else if (Array.isArray(content)) {
+              // Capture files from Write tool calls as they stream in, so the
+              // generated code is available without re-scanning messages later
+              for (const block of content) {
+                if (block.type !== 'tool_use' || block.name !== 'Write') {
+                  continue;
+                }
+                const input = block.input as { file_path?: unknown; content?: unknown };
+                if (typeof input.file_path === 'string' && typeof input.content === 'string') {
+                  const filename = path.relative(buildDir, input.file_path);
+                  codeGenerated.set(filename, input.content);
+                  recordFile(filename);
+                }
               }
             }
           }
           break;
           
         case "result":
+          // Record usage first so failed builds still report what they spent
+          usage = {
+            inputTokens: message.usage?.input_tokens ?? 0,
+            outputTokens: message.usage?.output_tokens ?? 0,
+            cacheReadInputTokens: message.usage?.cache_read_input_tokens ?? 0,
+            cacheCreationInputTokens: message.usage?.cache_creation_input_tokens ?? 0,
+            totalCostUsd: message.total_cost_usd ?? 0
+          };
+
+          if (resultSummary === undefined) {
+            resultSummary = 'result' in message && typeof message.result === 'string' ? message.result : "";
+          }
+
+          if (isLevelEnabled("debug")) {
+            logger.debug(
+              `Build finished (${message.subtype}) in ${message.num_turns} turns, ` +
+              `${message.duration_ms}ms, ${usage.outputTokens} output tokens`
+            );
+          }
+
+          resultIsError = resultIsError || message.is_error;
+
+          // Claude Code reports API failures, 429s included, as an error result
+          // carrying the API's error text rather than by throwing
+          if (message.is_error && 'result' in message && RATE_LIMIT_ERROR.test(message.result)) {
+            logger.warn("Claude API rate limit reached, throttling new builds");
+            rateLimiter.throttle();
+            throttled = true;
+          }
+
           // Handle result messages which contain final status
           if ('subtype' in message) {
             if (message.subtype === 'error_max_turns' || message.subtype === 'error_during_execution') {
@@ -156,62 +432,73 @@ Always create a complete, playable game that demonstrates the requested concept
           }
           break;
       }
+
+      yield { type: "message", message };
     }
     
     // Return results
-    return {
-      success: true,
+    completed = true;
+    await collectBuildFiles();
+    yield { type: "done", result: {
+      success: !resultIsError,
+      error: resultIsError ? resultSummary || "Claude Code reported an error" : undefined,
       messages,
       filesCreated,
       codeGenerated: Object.fromEntries(codeGenerated),
-      summary: extractSummary(messages)
-    };
+      summary: summary(),
+      usage
+    } };
     
   } catch (error) {
+    completed = true;
+    await collectBuildFiles();
+
+    // Back off all pending builds when the API reports throttling
+    if (!throttled && error instanceof Error && RATE_LIMIT_ERROR.test(error.message)) {
+      logger.warn("Claude API rate limit reached, throttling new builds");
+      rateLimiter.throttle();
+    }
+
     // Handle abort separately
     if (error instanceof Error && error.name === 'AbortError') {
-      return {
+      yield { type: "done", result: {
         success: false,
         error: "Request was aborted",
         messages,
         filesCreated,
         codeGenerated: Object.fromEntries(codeGenerated),
-        summary: extractSummary(messages)
-      };
+        summary: summary(),
+        usage
+      } };
+      return;
     }
     
-    return {
+    yield { type: "done", result: {
       success: false,
       error: error instanceof Error ? error.message : String(error),
       messages,
       filesCreated,
       codeGenerated: Object.fromEntries(codeGenerated),
-      summary: ""
-    };
-  }
-}
+      summary: "",
+      usage
+    } };
+  } finally {
+    // Stop the Claude Code subprocess if the consumer stopped iterating early
+    if (!completed) {
+      abortController.abort();
+    }
+    if (holdsSessionSlot) {
+      sessionSlots.release();
+    }
 
-// Helper to extract summary from messages
-function extractSummary(messages: SDKMessage[]): string {
-  // Find the last assistant message for summary
-  const assistantMessages = messages.filter(m => m.type === "assistant");
-  if (assistantMessages.length > 0) {
-    const lastMessage = assistantMessages[assistantMessages.length - 1];
-    if ('message' in lastMessage && lastMessage.message?.content) {
-      const content = lastMessage.message.content;
-      if (typeof content === 'string') {
-        return content.substring(0, 500); // Limit summary length
-      }
+    // collectBuildFiles has copied the files into the result before the final
+    // event, so the directory is no longer needed once the build ends
+    if (createdBuildDir) {
+      await fs.rm(buildDir, { recursive: true, force: true }).catch(error => {
+        logger.warn(`Failed to remove build directory ${buildDir}:`, error);
+      });
     }
   }
-  
-  // Check for result message as fallback
-  const resultMessage = messages.find(m => m.type === "result");
-  if (resultMessage && 'result' in resultMessage && typeof resultMessage.result === 'string') {
-    return resultMessage.result;
-  }
-  
-  return "";
 }
 
 // Helper function to get session info from messages
@@ -0,0 +1,184 @@
+import { buildWithClaude, streamWithClaude, type BuildEvent, type BuildResult } from "./buildWithClaude";
+import { logger } from "./logger";
+import { selectModel } from "./modelRouter";
+import { normalizePrompt, ResponseCache } from "./responseCache";
+import { Semaphore } from "./semaphore";
+
+// Each cached build holds its game files about four times over: in the Write
+// calls in the transcript, in codeGenerated, and again in the memoized JSON of
+// both. For a typical 10-40KB game that is up to ~160KB per entry, so 100
+// entries stay around 16MB.
+const RESPONSE_CACHE_MAX_ENTRIES = 100;
+
+// Successful builds keyed by normalized prompt, so repeat requests skip the SDK round-trip
+const responseCache = new ResponseCache<BuildResult>(RESPONSE_CACHE_MAX_ENTRIES);
+
+// Builds that are still running, keyed by model and normalized prompt, so a
+// duplicate POST /api/generate or /api/generate/async request joins the running
+// build instead of starting a second SDK session. The stream and batch routes
+// pass the client's abort signal and so always run their own build.
+const inFlightBuilds: Map<string, Promise<BuildResult>> = new Map();
+
+// JSON for each result object, so a cached build is only serialized once
+const serializedResults = new WeakMap<BuildResult, string>();
+
+// Batch builds run this many at a time unless the caller asks for another limit
+export const DEFAULT_BATCH_CONCURRENCY = Math.max(1, Number(process.env.CLAUDE_CONCURRENCY) || 4);
+
+// The game requirements live in the shared system prompt, which the API caches
+// across requests; the per-request user message is only this prefix and the prompt
+const GAME_REQUEST_PREFIX = "Create a Phaser 3 game: ";
+
+/**
+ * Validate and canonicalize the prompt from a generate request body
+ * @param rawPrompt - The `prompt` field from the request JSON
+ * @returns The trimmed prompt with LF line endings, or null if it is missing or blank
+ */
+export function parsePrompt(rawPrompt: unknown): string | null {
+  if (!rawPrompt || typeof rawPrompt !== 'string' || !rawPrompt.trim()) {
+    return null;
+  }
+
+  // Canonicalize whitespace so the same request always yields byte-identical prompt text
+  return rawPrompt.trim().replace(/\r\n?/g, '\n');
+}
+
+/**
+ * Enhance a user prompt to ensure Phaser 3 game development
+ * @param prompt - The canonicalized user prompt
+ * @returns The full prompt to send to Claude Code
+ */
+export function buildGamePrompt(prompt: string): string {
+  return GAME_REQUEST_PREFIX + prompt;
+}
+
+/**
+ * Build a game for a canonicalized prompt, serving and filling the response cache
+ * @param prompt - The canonicalized user prompt (see parsePrompt)
+ * @param useCache - Whether to read cached builds or join an identical running build
+ *   (successful builds are always stored)
+ * @param abortSignal - Optional AbortSignal to cancel the build
+ * @returns Promise with the build result
+ */
+export async function generateGame(
+  prompt: string,
+  useCache: boolean = true,
+  abortSignal?: AbortSignal
+): Promise<BuildResult> {
+  const model = selectModel(prompt);
+
+  const cached = useCache ? cachedBuild(prompt, model) : undefined;
+  if (cached) {
+    return cached;
+  }
+
+  // Only builds without an abort signal are shared, so one caller cancelling
+  // can't cancel the build for everyone waiting on it
+  if (!useCache || abortSignal) {
+    return buildAndCache(prompt, model, abortSignal);
+  }
+
+  const key = `${model ?? ""}\0${normalizePrompt(prompt)}`;
+  const pending = inFlightBuilds.get(key);
+  if (pending) {
+    logger.debug("Joining in-flight build");
+    return pending;
+  }
+
+  const build = buildAndCache(prompt, model);
+  inFlightBuilds.set(key, build);
+  try {
+    return await build;
+  } finally {
+    inFlightBuilds.delete(key);
+  }
+}
+
+/**
+ * Build several games concurrently through generateGame, so each one uses the response cache
+ * @param prompts - The canonicalized user prompts (see parsePrompt)
+ * @param concurrency - Maximum parallel builds (defaults to CLAUDE_CONCURRENCY or 4)
+ * @param useCache - Whether to read cached builds
+ * @param abortSignal - Optional AbortSignal to cancel every build in the batch
+ * @returns Promise with one BuildResult per prompt, in the same order
+ */
+export async function generateGames(
+  prompts: string[],
+  concurrency: number = DEFAULT_BATCH_CONCURRENCY,
+  useCache: boolean = true,
+  abortSignal?: AbortSignal
+): Promise<BuildResult[]> {
+  const semaphore = new Semaphore(concurrency);
+  return Promise.all(
+    prompts.map(prompt => semaphore.run(() => generateGame(prompt, useCache, abortSignal)))
+  );
+}
+
+/**
+ * Streaming variant of generateGame: a cached build arrives as a single "done" event,
+ * otherwise the build's messages stream in and a successful result is cached
+ * @param prompt - The canonicalized user prompt (see parsePrompt)
+ * @param useCache - Whether to read cached builds (successful builds are always stored)
+ * @param abortSignal - Optional AbortSignal to cancel the build
+ * @returns Async iterator of build events, ending with a "done" event
+ */
+export async function* streamGame(
+  prompt: string,
+  useCache: boolean = true,
+  abortSignal?: AbortSignal
+): AsyncGenerator<BuildEvent> {
+  const model = selectModel(prompt);
+
+  const cached = useCache ? cachedBuild(prompt, model) : undefined;
+  if (cached) {
+    yield { type: "done", result: cached };
+    return;
+  }
+
+  for await (const event of streamWithClaude(buildGamePrompt(prompt), abortSignal, model)) {
+    if (event.type === "done") {
+      storeBuild(prompt, event.result, model);
+    }
+    yield event;
+  }
+}
+
+function cachedBuild(prompt: string, model: string | undefined): BuildResult | undefined {
+  const cached = responseCache.get(prompt, model);
+  if (cached) {
+    logger.debug("Serving cached build");
+  }
+  return cached;
+}
+
+// Only builds that succeeded and produced files are worth serving again; a build
+// where the agent only replied (e.g. asked a question) is not cached
+function storeBuild(prompt: string, result: BuildResult, model: string | undefined): void {
+  if (result.success && Object.keys(result.codeGenerated).length > 0) {
+    responseCache.set(prompt, result, model);
+  }
+}
+
+async function buildAndCache(
+  prompt: string,
+  model: string | undefined,
+  abortSignal?: AbortSignal
+): Promise<BuildResult> {
+  const result = await buildWithClaude(buildGamePrompt(prompt), abortSignal, model);
+  storeBuild(prompt, result, model);
+  return result;
+}
+
+/**
+ * Serialize a build result to JSON, reusing the string for results seen before
+ * @param result - The build result to serialize
+ * @returns The JSON text of the result
+ */
+export function serializeResult(result: BuildResult): string {
+  let json = serializedResults.get(result);
+  if (json === undefined) {
+    json = JSON.stringify(result);
+    serializedResults.set(result, json);
+  }
+  return json;
+}
@@ -0,0 +1,94 @@
+import { randomUUID } from "crypto";
+import type { BuildResult } from "./buildWithClaude";
+
+export type Job =
+  | { status: "pending" }
+  | { status: "done"; result: BuildResult };
+
+interface JobEntry {
+  job: Job;
+  expiresAt: number;
+}
+
+// Finished jobs are kept for an hour so clients have time to collect them
+const JOB_TTL_MS = 60 * 60 * 1000;
+
+// Each finished job holds a full BuildResult, so the store is capped like the
+// response cache; pending jobs are capped lower because each one will run a
+// paid SDK session
+const MAX_JOBS = 100;
+const MAX_PENDING_JOBS = 20;
+
+const jobs: Map<string, JobEntry> = new Map();
+let pendingJobs = 0;
+
+function pruneExpired(now: number): void {
+  const expired: string[] = [];
+  jobs.forEach((entry, id) => {
+    if (entry.expiresAt <= now) {
+      expired.push(id);
+    }
+  });
+  expired.forEach(id => jobs.delete(id));
+}
+
+// Drop the oldest finished jobs until there is room for one more
+function evictFinished(): void {
+  const finished: string[] = [];
+  jobs.forEach((entry, id) => {
+    if (entry.job.status === "done") {
+      finished.push(id);
+    }
+  });
+  for (let i = 0; i < finished.length && jobs.size >= MAX_JOBS; i++) {
+    jobs.delete(finished[i]);
+  }
+}
+
+/**
+ * Start a build in the background and return immediately
+ * @param run - Function that performs the build
+ * @returns The id to poll with getJob, or undefined if too many builds are already pending
+ */
+export function startJob(run: () => Promise<BuildResult>): string | undefined {
+  const now = Date.now();
+  pruneExpired(now);
+
+  if (pendingJobs >= MAX_PENDING_JOBS) {
+    return undefined;
+  }
+  evictFinished();
+
+  const id = randomUUID();
+  jobs.set(id, { job: { status: "pending" }, expiresAt: now + JOB_TTL_MS });
+  pendingJobs++;
+
+  const finish = (result: BuildResult) => {
+    pendingJobs--;
+    jobs.set(id, { job: { status: "done", result }, expiresAt: Date.now() + JOB_TTL_MS });
+  };
+
+  run().then(finish, error => finish({
+    success: false,
+    error: error instanceof Error ? error.message : String(error),
+    messages: [],
+    filesCreated: [],
+    codeGenerated: {},
+    summary: ""
+  }));
+
+  return id;
+}
+
+/**
+ * Look up a background build
+ * @param id - The id returned by startJob
+ * @returns The job, or undefined if it is unknown or expired
+ */
+export function getJob(id: string): Job | undefined {
+  const entry = jobs.get(id);
+  if (!entry || entry.expiresAt <= Date.now()) {
+    return undefined;
+  }
+  return entry.job;
+}
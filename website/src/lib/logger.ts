@@ -0,0 +1,33 @@
+type LogLevel = "debug" | "info" | "warn" | "error";
+
+const LEVELS: Record<LogLevel, number> = { debug: 10, info: 20, warn: 30, error: 40 };
+
+// Minimum level to emit, read from LOG_LEVEL (defaults to info) on first use rather
+// than at import, so a level that dotenv.config() loads from .env is honored
+let threshold: number | undefined;
+
+function getThreshold(): number {
+  if (threshold === undefined) {
+    threshold = LEVELS[(process.env.LOG_LEVEL?.toLowerCase() as LogLevel)] ?? LEVELS.info;
+  }
+  return threshold;
+}
+
+/**
+ * Check whether a level is enabled, so callers can skip building expensive log arguments
+ * @param level - The log level to check
+ * @returns True if messages at this level will be written
+ */
+export function isLevelEnabled(level: LogLevel): boolean {
+  return LEVELS[level] >= getThreshold();
+}
+
+/**
+ * Leveled server-side logger; messages below LOG_LEVEL are dropped before reaching the console
+ */
+export const logger = {
+  debug: (...args: unknown[]) => { if (isLevelEnabled("debug")) console.debug(...args); },
+  info: (...args: unknown[]) => { if (isLevelEnabled("info")) console.info(...args); },
+  warn: (...args: unknown[]) => { if (isLevelEnabled("warn")) console.warn(...args); },
+  error: (...args: unknown[]) => { if (isLevelEnabled("error")) console.error(...args); },
+};
@@ -0,0 +1,25 @@
+import { logger } from "./logger";
+
+// Requests that suggest a larger game than a short prompt implies
+const COMPLEX_REQUEST = /\b(complex|multi-?level|multiplayer|mmo|rpg|procedural|open.?world)\b/i;
+
+// Prompts shorter than this are simple one-line game ideas
+const SHORT_PROMPT_LENGTH = 120;
+
+// The environment doesn't change while the server runs, so read it once
+const FAST_MODEL = process.env.CLAUDE_FAST_MODEL;
+const DEFAULT_MODEL = process.env.CLAUDE_MODEL;
+
+/**
+ * Pick the model for a game request: short, simple prompts go to CLAUDE_FAST_MODEL
+ * when it is configured, everything else uses CLAUDE_MODEL
+ * @param prompt - The user's game request, before prompt enhancement
+ * @returns The model name, or undefined to use the SDK default
+ */
+export function selectModel(prompt: string): string | undefined {
+  if (FAST_MODEL && prompt.length < SHORT_PROMPT_LENGTH && !COMPLEX_REQUEST.test(prompt)) {
+    logger.debug(`Routing short prompt to fast model ${FAST_MODEL}`);
+    return FAST_MODEL;
+  }
+  return DEFAULT_MODEL;
+}
@@ -0,0 +1,76 @@
+// Longest pause after repeated rate limit errors
+const MAX_BACKOFF_MS = 2 * 60 * 1000;
+
+/**
+ * Token-bucket rate limiter that smooths request bursts to stay under an API's
+ * requests-per-minute limit, and backs off when the API reports throttling
+ */
+export class RateLimiter {
+  private tokens: number;
+  private lastRefill: number = Date.now();
+  private readonly refillPerMs: number;
+  private pausedUntil: number = 0;
+  private backoffMs: number = 0;
+
+  constructor(requestsPerMinute: number, private burstLimit: number) {
+    this.tokens = burstLimit;
+    this.refillPerMs = requestsPerMinute / 60000;
+  }
+
+  private refill(): void {
+    const now = Date.now();
+    this.tokens = Math.min(
+      this.burstLimit,
+      this.tokens + (now - this.lastRefill) * this.refillPerMs
+    );
+    this.lastRefill = now;
+  }
+
+  /**
+   * Wait until a request may be sent, then consume one token
+   */
+  async acquire(): Promise<void> {
+    for (;;) {
+      const pauseMs = this.pausedUntil - Date.now();
+      if (pauseMs > 0) {
+        await new Promise(resolve => setTimeout(resolve, pauseMs));
+        continue;
+      }
+
+      this.refill();
+      if (this.tokens >= 1) {
+        this.tokens -= 1;
+        return;
+      }
+      const waitMs = Math.ceil((1 - this.tokens) / this.refillPerMs);
+      await new Promise(resolve => setTimeout(resolve, waitMs));
+    }
+  }
+
+  /**
+   * Pause every caller after the API rejects a request for rate limiting. The first
+   * pause lasts a full refill interval (the time to refill the whole burst); a
+   * rejection soon after a pause ends doubles it, up to MAX_BACKOFF_MS
+   */
+  throttle(): void {
+    const now = Date.now();
+
+    // Builds already in flight when the pause began can fail too; they don't
+    // mean the pause is too short, so they don't extend it
+    if (now < this.pausedUntil) {
+      return;
+    }
+
+    const refillIntervalMs = this.burstLimit / this.refillPerMs;
+    const recentlyPaused = now < this.pausedUntil + this.backoffMs;
+    this.backoffMs = recentlyPaused
+      ? Math.min(this.backoffMs * 2, MAX_BACKOFF_MS)
+      : refillIntervalMs;
+    this.pausedUntil = now + this.backoffMs;
+
+    // Start refilling from empty once the pause ends, rather than releasing
+    // a full burst the moment it is over
+    this.tokens = 0;
+    this.lastRefill = this.pausedUntil;
+  }
+}
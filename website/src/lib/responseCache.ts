@@ -0,0 +1,89 @@
+import { createHash } from "crypto";
+
+interface CacheEntry<T> {
+  value: T;
+  expiresAt: number;
+}
+
+// An explicit leading request phrase ("please make me a ...") that doesn't change
+// which game is being asked for. Only these words are stripped; content words such
+// as "game", "of" or "the" are kept because they can be part of the game's name.
+const LEADING_REQUEST = /^(?:please\s+)?(?:make|create|build|generate|write)\s+(?:me\s+)?(?:an?\s+)?/;
+
+// Punctuation that ends a sentence rather than meaning anything ("snake game!")
+const TRAILING_PUNCTUATION = /[\s.!?,;:]+$/;
+
+/**
+ * Reduce a prompt to a canonical form so equivalent requests map to the same key
+ * @param prompt - The raw user prompt
+ * @returns Lowercased prompt with collapsed whitespace, and without trailing
+ *   punctuation or a leading request phrase
+ */
+export function normalizePrompt(prompt: string): string {
+  const canonical = prompt
+    .normalize("NFC")
+    .toLowerCase()
+    .replace(/\s+/g, " ")
+    .replace(TRAILING_PUNCTUATION, "")
+    .trim();
+
+  // Keep the phrase if it is the whole prompt ("make a game" stays as is)
+  return canonical.replace(LEADING_REQUEST, "") || canonical;
+}
+
+/**
+ * In-memory LRU cache with a TTL, keyed by the SHA-256 of a namespace and the normalized prompt
+ */
+export class ResponseCache<T> {
+  private entries: Map<string, CacheEntry<T>> = new Map();
+
+  constructor(
+    private maxSize: number = 1000,
+    private ttlMs: number = 60 * 60 * 1000
+  ) {}
+
+  // The namespace (e.g. the model name) keeps entries for different configurations apart
+  private key(prompt: string, namespace: string): string {
+    return createHash("sha256")
+      .update(namespace)
+      .update("\0")
+      .update(normalizePrompt(prompt))
+      .digest("hex");
+  }
+
+  get(prompt: string, namespace: string = ""): T | undefined {
+    const key = this.key(prompt, namespace);
+    const entry = this.entries.get(key);
+    if (!entry) {
+      return undefined;
+    }
+
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      return undefined;
+    }
+
+    // Re-insert so the Map's insertion order tracks recency
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    return entry.value;
+  }
+
+  set(prompt: string, value: T, namespace: string = ""): void {
+    const key = this.key(prompt, namespace);
+    this.entries.delete(key);
+    this.entries.set(key, { value, expiresAt: Date.now() + this.ttlMs });
+
+    // Evict the least recently used entry once over capacity
+    if (this.entries.size > this.maxSize) {
+      const oldest = this.entries.keys().next().value;
+      if (oldest !== undefined) {
+        this.entries.delete(oldest);
+      }
+    }
+  }
+
+  clear(): void {
+    this.entries.clear();
+  }
+}
@@ -0,0 +1,44 @@
+/**
+ * Counting semaphore for bounding the number of concurrent async operations
+ */
+export class Semaphore {
+  private waiters: Array<() => void> = [];
+
+  constructor(private permits: number) {
+    if (permits < 1) {
+      throw new Error("Semaphore requires at least one permit");
+    }
+  }
+
+  async acquire(): Promise<void> {
+    if (this.permits > 0) {
+      this.permits--;
+      return;
+    }
+    await new Promise<void>(resolve => this.waiters.push(resolve));
+  }
+
+  release(): void {
+    // Hand the permit straight to the next waiter, if any
+    const next = this.waiters.shift();
+    if (next) {
+      next();
+    } else {
+      this.permits++;
+    }
+  }
+
+  /**
+   * Run a task once a permit is available, releasing it when the task settles
+   * @param task - The async work to run
+   * @returns Promise resolving to the task's result
+   */
+  async run<T>(task: () => Promise<T>): Promise<T> {
+    await this.acquire();
+    try {
+      return await task();
+    } finally {
+      this.release();
+    }
+  }
+}